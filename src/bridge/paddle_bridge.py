@@ -7,7 +7,7 @@ This bridge is spawned by the Node.js backend and communicates via HTTP on port
 
 Supports three tiers:
 - eco: Standard PaddleOCR (fast, lightweight, CPU-friendly)
-- lite: PaddleOCR-VL-1.5 with 4-bit quantization
+- lite: PaddleOCR-VL-1.5 in bf16 (4-bit quantization when VRAM is tight)
 - pro: PaddleOCR-VL-1.5 full precision
 
 Usage:
@@ -28,10 +28,25 @@ os.environ["PADDLEX_HOME"] = os.path.join(cache_dir, "paddlex")
 os.environ["HF_HOME"] = os.path.join(cache_dir, "hf")
 os.environ["PADDLE_PDX_DISABLE_MODEL_SOURCE_CHECK"] = "True"
 
-import base64
+# Parallel Rust downloader for VLM weights; huggingface_hub errors out if the
+# flag is set without the package, so only enable it when installed
+import importlib.util
+if importlib.util.find_spec("hf_transfer") is not None:
+    os.environ.setdefault("HF_HUB_ENABLE_HF_TRANSFER", "1")
+
 import argparse
-from fastapi import FastAPI, HTTPException
+import asyncio
+import hashlib
+import atexit
+import logging
+import logging.handlers
+import queue
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+import numpy as np
+from fastapi import FastAPI, HTTPException, Request
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 from PIL import Image
 from io import BytesIO
 
@@ -39,35 +54,193 @@ from io import BytesIO
 sys.stdout.reconfigure(line_buffering=True)
 sys.stderr.reconfigure(line_buffering=True)
 
+# Log records are queued and written by a background listener thread, so
+# request threads never block on stdout. Per-request detail is DEBUG-level;
+# set OCR_LOG_LEVEL=DEBUG to see it. Spawned uvicorn workers execute this file
+# twice (as __mp_main__ and as paddle_bridge), so only attach the handler once.
+logger = logging.getLogger("paddle_bridge")
+logger.setLevel(os.environ.get("OCR_LOG_LEVEL", "INFO").upper())
+logger.propagate = False
+if not logger.handlers:
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    log_listener = logging.handlers.QueueListener(log_queue, logging.StreamHandler(sys.stdout))
+    log_listener.start()
+    atexit.register(log_listener.stop)
+
 # Suppress noisy deprecation warnings
 import warnings
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 
+# Optional: SIMD base64 decoder (API-compatible with the stdlib module)
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
+
+# Optional: libjpeg-turbo SIMD decoder for the JPEG hot path
+try:
+    from turbojpeg import TurboJPEG
+    turbo_jpeg = TurboJPEG()
+except Exception:
+    turbo_jpeg = None
+
+# Optional: xxh3 hashes faster than BLAKE2b for result-cache keys
+try:
+    import xxhash
+    new_cache_hasher = xxhash.xxh3_128
+except ImportError:
+    def new_cache_hasher():
+        return hashlib.blake2b(digest_size=16)
+
+# Optional: OpenCV decodes straight to BGR (installed alongside PaddleOCR)
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+JPEG_MAGIC = b"\xff\xd8\xff"
+
+# Longest image edge fed to OCR; larger inputs are downscaled first since
+# detection accuracy plateaus well below scanner resolutions (0 disables)
+OCR_MAX_EDGE = int(os.environ.get("OCR_MAX_EDGE", "1920"))
+
+
 # =============================================================================
 # CLI Arguments
 # =============================================================================
 parser = argparse.ArgumentParser(description="PaddleOCR Bridge Server")
 parser.add_argument("--tier", type=str, default="eco", choices=["eco", "lite", "pro"],
-                    help="Model tier to use (eco=fast OCR, lite=VLM quantized, pro=VLM full)")
+                    help="Model tier to use (eco=fast OCR, lite=VLM reduced precision, pro=VLM full)")
+parser.add_argument("--engine", type=str, default=os.environ.get("OCR_ECO_ENGINE", "paddle"),
+                    choices=["paddle", "onnx"],
+                    help="Eco tier runtime (paddle=PaddleOCR, onnx=PP-OCRv4 on ONNX Runtime via RapidOCR)")
+parser.add_argument("--compile", action="store_true",
+                    help="Compile the VLM with torch.compile on CUDA (lite/pro tiers, requires torch>=2.2)")
 args = parser.parse_args()
 
-# =============================================================================
-# FastAPI Application
-# =============================================================================
-app = FastAPI(
-    title="PaddleOCR Bridge",
-    description="HTTP bridge for PaddleOCR text extraction",
-    version="1.0.0"
-)
+# Eco inference is CPU-bound, so it scales out across worker processes, each
+# with its share of the cores. VLM tiers share one GPU and stay single-process.
+cpu_count = os.cpu_count() or 1
+if args.tier == "eco":
+    num_workers = max(1, int(os.environ.get("OCR_WORKERS", max(2, cpu_count // 2))))
+else:
+    num_workers = 1
+threads_per_worker = max(1, cpu_count // num_workers)
+os.environ.setdefault("PADDLE_NUM_THREADS", str(threads_per_worker))
+
+# torch is only needed (and often only installed) for the VLM tiers
+if args.tier == "eco":
+    torch = None
+else:
+    import torch
 
 # Global model instances
 model = None
 tokenizer = None
 ocr_engine = None
-is_processing = False
+
+# Tier-specific request handler, bound by load_model()
+handle_request = None
+
+# Requests queued or running in this process, reported by /health. Only
+# touched from the event loop thread, so a plain counter is safe.
+inflight = 0
+
+# Concurrent inferences per process. Defaults to 1: Paddle predictors are not
+# thread-safe and the VLM owns the GPU, and eco scales out via workers instead.
+# Request decoding still overlaps with the running inference.
+inference_concurrency = int(os.environ.get("OCR_CONCURRENCY", "1"))
+inference_slot = asyncio.Semaphore(inference_concurrency)
+
+# LRU of image-bytes digest -> extracted text, so retries of the same image skip
+# decoding and inference. Only touched from the event loop thread.
+RESULT_CACHE_SIZE = int(os.environ.get("OCR_CACHE_SIZE", "512"))
+result_cache = OrderedDict()
+
 MODEL_ID = "PaddlePaddle/PaddleOCR-VL-1.5"
+VLM_PROMPT = "Extract all text and structured info from this document."
+
+# Free VRAM needed to load the lite VLM in bf16 before falling back to 4-bit
+LITE_BF16_MIN_FREE_VRAM = 4 * 1024 ** 3
+
+logger.info("📡 Initializing Paddle Bridge [Tier: %s]", args.tier)
+
+
+def cpu_supports_avx2():
+    """Return True if the host CPU advertises AVX2 (required for fast oneDNN kernels)."""
+    try:
+        import cpuinfo
+        return "avx2" in cpuinfo.get_cpu_info().get("flags", [])
+    except ImportError:
+        pass
+    
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("flags"):
+                    return "avx2" in line.split()
+    except OSError:
+        pass
+    return False
+
+
+def create_ocr_engine(paddle_ocr_cls, enable_mkldnn):
+    """Construct the eco-tier PaddleOCR engine using this worker's share of CPU cores."""
+    return paddle_ocr_cls(
+        use_angle_cls=True,
+        lang="en",
+        enable_mkldnn=enable_mkldnn,
+        cpu_threads=threads_per_worker
+    )
+
+
+class OnnxOCREngine:
+    """
+    PP-OCRv4 det/cls/rec running on ONNX Runtime (via RapidOCR).
+    
+    Exposes the same ``ocr(image)`` call as PaddleOCR and returns results in
+    PaddleOCR's legacy ``[[box, (text, score)], ...]`` layout, so the request
+    path does not need to know which runtime is active. Set OCR_ONNX_REC_MODEL
+    to swap in an INT8-quantized recognizer.
+    """
+
+    def __init__(self):
+        from rapidocr_onnxruntime import RapidOCR
+        
+        engine_args = {"intra_op_num_threads": threads_per_worker}
+        rec_model_path = os.environ.get("OCR_ONNX_REC_MODEL")
+        if rec_model_path:
+            engine_args["rec_model_path"] = rec_model_path
+        self.engine = RapidOCR(**engine_args)
+
+    def ocr(self, image):
+        result, _ = self.engine(image)
+        return [[[box, (text, score)] for box, text, score in (result or [])]]
 
-print(f"📡 Initializing Paddle Bridge [Tier: {args.tier}]")
+
+def make_warmup_image():
+    """
+    Return a small BGR image with printed text for eco-tier warmup.
+    
+    A blank image yields no detections, so the recognition and angle
+    classifier predictors would never run. Real text makes every predictor
+    execute, which matters for catching MKL-DNN failures at startup.
+    """
+    if cv2 is not None:
+        image_arr = np.full((96, 480, 3), 255, dtype=np.uint8)
+        cv2.putText(image_arr, "Warmup OCR 2024", (12, 64), cv2.FONT_HERSHEY_SIMPLEX,
+                    1.5, (0, 0, 0), 3, cv2.LINE_AA)
+        return image_arr
+    
+    from PIL import ImageDraw, ImageFont
+    image_pil = Image.new("RGB", (480, 96), (255, 255, 255))
+    try:
+        font = ImageFont.load_default(size=48)
+    except TypeError:
+        font = ImageFont.load_default()
+    ImageDraw.Draw(image_pil).text((12, 20), "Warmup OCR 2024", fill=(0, 0, 0), font=font)
+    return np.asarray(image_pil)[:, :, ::-1].copy()
 
 
 def load_model():
@@ -75,38 +248,53 @@ def load_model():
     Initialize the OCR/VLM model based on the selected tier.
     
     - eco: Uses standard PaddleOCR with PP-OCRv4/v5 models
-    - lite: Uses VLM with 4-bit quantization (requires bitsandbytes)
+    - lite: Uses VLM in bf16, or 4-bit quantization (bitsandbytes) when VRAM is tight
     - pro: Uses VLM at full precision
     
     The model is warmed up with a dummy image to ensure fast first requests.
     """
-    global model, tokenizer, ocr_engine
+    global model, tokenizer, ocr_engine, handle_request
     
     try:
         if args.tier == "eco":
-            from paddleocr import PaddleOCR
-            print("📦 Loading Standard PaddleOCR (Eco - PP-OCRv4 Mobile)...")
+            dummy = make_warmup_image()
+            warmed_up = False
+            
+            if args.engine == "onnx":
+                logger.info("📦 Loading PP-OCRv4 on ONNX Runtime (Eco)...")
+                ocr_engine = OnnxOCREngine()
+                logger.info("✅ OCR Engine initialized (ONNX Runtime).")
+            else:
+                from paddleocr import PaddleOCR
+                logger.info("📦 Loading Standard PaddleOCR (Eco - PP-OCRv4 Mobile)...")
             
-            # Minimal arguments for broad compatibility
-            # enable_mkldnn=False prevents Intel MKL-DNN errors on some CPUs
-            ocr_engine = PaddleOCR(
-                use_angle_cls=True, 
-                lang="en",
-                enable_mkldnn=False
-            )
-            print("✅ OCR Engine initialized.")
+                # oneDNN (MKL-DNN) kernels are much faster on AVX2-capable CPUs
+                # but error out on some older ones, usually on the first
+                # predict, so warm up with it enabled and fall back on failure
+                use_mkldnn = cpu_supports_avx2()
+                try:
+                    ocr_engine = create_ocr_engine(PaddleOCR, use_mkldnn)
+                    if use_mkldnn:
+                        logger.info("🔥 Warming up models...")
+                        ocr_engine.ocr(dummy)
+                        warmed_up = True
+                except Exception as e:
+                    if not use_mkldnn:
+                        raise
+                    logger.warning("⚠️ MKL-DNN failed (%s), retrying without it", e)
+                    use_mkldnn = False
+                    ocr_engine = create_ocr_engine(PaddleOCR, use_mkldnn)
+                logger.info("✅ OCR Engine initialized (MKL-DNN: %s).", "on" if use_mkldnn else "off")
             
             # Warmup to ensure first request is fast
-            print("🔥 Warming up models...")
-            try:
-                import numpy as np
-                dummy = np.zeros((64, 64, 3), dtype=np.uint8)
-                ocr_engine.ocr(dummy)
-            except Exception as e:
-                print(f"⚠️ Warmup warning (safe to ignore): {e}")
+            if not warmed_up:
+                logger.info("🔥 Warming up models...")
+                try:
+                    ocr_engine.ocr(dummy)
+                except Exception as e:
+                    logger.warning("⚠️ Warmup warning (safe to ignore): %s", e)
         else:
             # VLM tiers (lite/pro)
-            import torch
             from transformers import AutoModel, AutoTokenizer
             
             device = "cpu"
@@ -115,39 +303,88 @@ def load_model():
             elif torch.backends.mps.is_available():
                 device = "mps"
                 
-            print(f"📡 Loading VLM {MODEL_ID} ({args.tier}) [Device: {device}]...")
+            logger.info("📡 Loading VLM %s (%s) [Device: %s]...", MODEL_ID, args.tier, device)
+            
+            if device == "cuda":
+                # Let remaining FP32 matmuls use TF32 tensor cores (Ampere+)
+                torch.set_float32_matmul_precision("high")
+                torch.backends.cuda.matmul.allow_tf32 = True
+                torch.backends.cudnn.allow_tf32 = True
             
             load_args = {"trust_remote_code": True}
             if args.tier == "lite":
                 if device == "mps":
                     # MPS optimization: Use float16 instead of 4-bit quantization
-                    print("🍎 Optimizing for Apple Silicon (MPS)")
+                    logger.info("🍎 Optimizing for Apple Silicon (MPS)")
                     load_args["torch_dtype"] = torch.float16
-                    print("✨ Using float16 precision for Lite tier on MPS")
+                    logger.info("✨ Using float16 precision for Lite tier on MPS")
+                elif (device == "cuda" and torch.cuda.is_bf16_supported()
+                        and torch.cuda.mem_get_info()[0] >= LITE_BF16_MIN_FREE_VRAM):
+                    # bnb NF4 dequantizes on every matmul and is slower than
+                    # bf16 on a model this small, so only quantize when needed
+                    load_args["torch_dtype"] = torch.bfloat16
+                    logger.info("✨ Using bfloat16 precision for Lite tier")
                 else:
                     try:
                         from transformers import BitsAndBytesConfig
                         bnb_config = BitsAndBytesConfig(load_in_4bit=True)
                         load_args["quantization_config"] = bnb_config
-                        print("✨ Using 4-bit quantization for Lite tier")
+                        logger.info("✨ Using 4-bit quantization for Lite tier")
                     except ImportError:
-                        print("⚠️ bitsandbytes not found, falling back to standard precision")
+                        logger.warning("⚠️ bitsandbytes not found, falling back to standard precision")
             
             model = AutoModel.from_pretrained(MODEL_ID, **load_args).to(device)
-            tokenizer = AutoTokenizer.from_pretrained(MODEL_ID, trust_remote_code=True)
+            tokenizer = AutoTokenizer.from_pretrained(MODEL_ID, trust_remote_code=True, use_fast=True)
+            if not getattr(tokenizer, "is_fast", False):
+                logger.warning("⚠️ Fast tokenizer unavailable, using slow Python tokenizer")
             model.eval()
             
-        print("✅ Ready.")
+            if args.compile and device == "cuda":
+                # Compile in place so model.chat's internal forward calls
+                # go through the compiled graph; warmup below triggers it
+                logger.info("⚙️ Compiling VLM with torch.compile...")
+                model.compile(mode="reduce-overhead", fullgraph=False)
+            
+            # Warmup so CUDA context init, kernel selection and tokenizer
+            # setup happen now rather than on the first user request
+            logger.info("🔥 Warming up models...")
+            try:
+                dummy = Image.new("RGB", (224, 224), (255, 255, 255))
+                warmup_runs = 2 if device == "cuda" else 1
+                for _ in range(warmup_runs):
+                    with torch.inference_mode():
+                        model.chat(tokenizer, dummy, VLM_PROMPT, history=None)
+                if device == "cuda":
+                    torch.cuda.synchronize()
+            except Exception as e:
+                logger.warning("⚠️ Warmup warning (safe to ignore): %s", e)
+            
+        # The tier is fixed for the life of the process, so bind its handler
+        # once instead of branching on every request
+        handle_request = handle_eco if args.tier == "eco" else handle_vlm
+        logger.info("✅ Ready.")
         
     except Exception as e:
-        print(f"❌ Initialization Error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Initialization Error: %s", e)
         sys.exit(1)
 
 
-# Initialize model on startup
-load_model()
+# =============================================================================
+# FastAPI Application
+# =============================================================================
+@asynccontextmanager
+async def lifespan(app):
+    """Load the model inside each serving process rather than at import time."""
+    load_model()
+    yield
+
+
+app = FastAPI(
+    title="PaddleOCR Bridge",
+    description="HTTP bridge for PaddleOCR text extraction",
+    version="1.0.0",
+    lifespan=lifespan
+)
 
 
 # =============================================================================
@@ -156,6 +393,149 @@ load_model()
 class OCRRequest(BaseModel):
     """Request body for OCR endpoint"""
     image_base64: str
+    no_cache: bool = False
+
+
+# =============================================================================
+# Image Decoding
+# =============================================================================
+def payload_bytes(payload):
+    """Return the image bytes for a request payload (raw bytes or base64 text)."""
+    if isinstance(payload, str):
+        try:
+            payload = base64.b64decode(payload)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid base64 payload: {e}")
+    if not payload:
+        raise HTTPException(status_code=400, detail="Empty image payload")
+    return payload
+
+
+def image_digest(image_data):
+    """Hash decoded image bytes for the result cache, independent of transport."""
+    hasher = new_cache_hasher()
+    hasher.update(image_data)
+    return hasher.digest()
+
+
+def decode_image_bgr(image_data):
+    """
+    Decode raw image bytes into a BGR uint8 array, as PaddleOCR expects.
+    
+    JPEGs go straight through TurboJPEG when it is installed. Everything else
+    goes through OpenCV. Both produce BGR natively, so no channel swap or
+    extra copy is needed. PIL is the last resort for formats neither handles.
+    """
+    if turbo_jpeg is not None and image_data[:3] == JPEG_MAGIC:
+        try:
+            return downscale_bgr(turbo_jpeg.decode(image_data))
+        except Exception as e:
+            # e.g. CMYK/Adobe JPEGs; the slower decoders below handle them
+            logger.debug("TurboJPEG decode failed (%s), falling back", e)
+    
+    if cv2 is not None:
+        # Ignore EXIF orientation, matching the TurboJPEG and PIL paths
+        flags = cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION
+        image_arr = cv2.imdecode(np.frombuffer(image_data, dtype=np.uint8), flags)
+        if image_arr is not None:
+            return downscale_bgr(image_arr)
+    
+    image_pil = decode_image_rgb(image_data)
+    return np.asarray(image_pil)[:, :, ::-1].copy()
+
+
+def downscale_bgr(image_arr):
+    """Shrink a BGR array so its longest edge is at most OCR_MAX_EDGE."""
+    height, width = image_arr.shape[:2]
+    if OCR_MAX_EDGE <= 0 or max(height, width) <= OCR_MAX_EDGE:
+        return image_arr
+    
+    scale = OCR_MAX_EDGE / max(height, width)
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    if cv2 is not None:
+        return cv2.resize(image_arr, size, interpolation=cv2.INTER_AREA)
+    return np.asarray(Image.fromarray(image_arr).resize(size, Image.Resampling.BOX))
+
+
+def decode_image_rgb(image_data):
+    """Decode raw image bytes into an RGB PIL image, capped at OCR_MAX_EDGE."""
+    image_pil = Image.open(BytesIO(image_data))
+    oversized = OCR_MAX_EDGE > 0 and max(image_pil.size) > OCR_MAX_EDGE
+    if oversized:
+        # Lets libjpeg decode JPEGs at a reduced scale; no-op for other formats
+        image_pil.draft("RGB", (OCR_MAX_EDGE, OCR_MAX_EDGE))
+    image_pil.load()
+    # Most JPEGs are already RGB; skip the full-image copy convert() makes
+    if image_pil.mode != "RGB":
+        image_pil = image_pil.convert("RGB")
+    if oversized:
+        image_pil.thumbnail((OCR_MAX_EDGE, OCR_MAX_EDGE), Image.Resampling.LANCZOS)
+    return image_pil
+
+
+# =============================================================================
+# Inference
+# Blocking calls; the endpoints run these in the threadpool so the event
+# loop stays free for health checks and new connections
+# =============================================================================
+def eco_ocr(image_arr):
+    """Run PaddleOCR over a decoded BGR array and return the extracted text."""
+    # Feed PaddleOCR an in-memory array instead of round-tripping
+    # through a temporary JPEG on disk
+    logger.debug("🔍 Running PaddleOCR engine...")
+    result = ocr_engine.ocr(image_arr)
+    logger.debug("✅ OCR Engine finished.")
+    
+    # Parse result based on PaddleOCR version
+    text = ""
+    if result and len(result) > 0:
+        first_result = result[0]
+    
+        # PaddleOCR v3 format: OCRResult with 'rec_texts' key
+        if hasattr(first_result, 'get') or isinstance(first_result, dict):
+            rec_texts = first_result.get('rec_texts', [])
+            text = " ".join(rec_texts)
+            logger.debug("📄 Using v3 format, found %d text blocks", len(rec_texts))
+    
+        # Legacy format: list of [box, (text, score)]
+        elif isinstance(first_result, list):
+            for line in first_result:
+                if line and len(line) >= 2:
+                    text += line[1][0] + " "
+            logger.debug("📄 Using legacy format")
+    
+    summary = text.strip()
+    logger.debug("📊 Extracted %d chars.", len(summary))
+    logger.debug("📝 Content: '%s%s'", summary[:200], "..." if len(summary) > 200 else "")
+    return summary
+
+
+def vlm_ocr(image_pil):
+    """Run the VLM over a decoded image and return its response text."""
+    with torch.inference_mode():
+        res, _ = model.chat(tokenizer, image_pil, VLM_PROMPT, history=None)
+    return res
+
+
+async def handle_eco(image_data):
+    """Eco tier: decode to BGR and run PaddleOCR."""
+    image_arr = await run_in_threadpool(decode_image_bgr, image_data)
+    logger.debug("📸 Image decoded: %dx%dpx", image_arr.shape[1], image_arr.shape[0])
+    
+    async with inference_slot:
+        return await run_in_threadpool(eco_ocr, image_arr)
+
+
+async def handle_vlm(image_data):
+    """Lite/pro tiers: decode to an RGB PIL image and run the VLM."""
+    image_pil = await run_in_threadpool(decode_image_rgb, image_data)
+    logger.debug("📸 Image opened: %spx", image_pil.size)
+    
+    logger.debug("🧠 Running VLM inference...")
+    async with inference_slot:
+        res = await run_in_threadpool(vlm_ocr, image_pil)
+    logger.debug("✅ VLM finished.")
+    return res
 
 
 # =============================================================================
@@ -168,14 +548,16 @@ async def health():
     
     Returns:
         - status: "ok" if model is loaded, "loading" otherwise
-        - busy: True if currently processing a request
+        - busy: True if any request is queued or running
+        - busy_count: Number of requests queued or running in this worker
         - tier: The active model tier
         - model: The model name/ID
     """
     is_ready = ocr_engine is not None or model is not None
     return {
         "status": "ok" if is_ready else "loading",
-        "busy": is_processing,
+        "busy": inflight > 0,
+        "busy_count": inflight,
         "tier": args.tier,
         "model": MODEL_ID if args.tier != "eco" else "PP-OCRv4-Mobile"
     }
@@ -190,102 +572,100 @@ async def root():
     }
 
 
-@app.post("/ocr")
-async def perform_ocr(request: OCRRequest):
+async def run_ocr(payload, use_cache=True):
     """
-    Perform OCR on a base64-encoded image.
+    Run the active tier's OCR/VLM pipeline on an image payload.
+    
+    Shared by the base64 and raw-upload endpoints. The payload is either raw
+    bytes or base64 text; base64 is decoded in the threadpool. Results are
+    cached by a digest of the decoded image bytes, so the same image hits the
+    cache whichever route or base64 wrapping it arrived with, unless
+    use_cache is False.
     
-    Args:
-        request: OCRRequest containing image_base64
-        
     Returns:
         {"result": "extracted text content"}
-        
-    Raises:
-        503: If model not ready
-        500: If OCR processing fails
     """
-    global is_processing
-    is_processing = True
+    global inflight
+    inflight += 1
     
     try:
-        if args.tier == "eco" and ocr_engine is None:
+        if handle_request is None:
             raise HTTPException(status_code=503, detail="OCR Engine not ready yet. Please wait.")
 
-        print("📥 Received OCR request")
+        logger.debug("📥 Received OCR request")
+        
+        image_data = await run_in_threadpool(payload_bytes, payload)
         
-        # Decode and open image
-        image_data = base64.b64decode(request.image_base64)
-        image_pil = Image.open(BytesIO(image_data)).convert("RGB")
-        print(f"📸 Image opened: {image_pil.size}px")
+        cache_key = None
+        if use_cache and RESULT_CACHE_SIZE > 0:
+            cache_key = await run_in_threadpool(image_digest, image_data)
+            cached = result_cache.get(cache_key)
+            if cached is not None:
+                result_cache.move_to_end(cache_key)
+                logger.debug("⚡ Returning cached result")
+                return {"result": cached}
 
-        if args.tier == "eco":
-            # Use temporary file for PaddleOCR (required for v3 API)
-            temp_path = "/tmp/ocr_temp.jpg"
-            image_pil.save(temp_path)
-            
-            print("🔍 Running PaddleOCR engine...")
-            result = ocr_engine.ocr(temp_path)
-            print("✅ OCR Engine finished.")
-            
-            # Clean up temp file
-            try:
-                os.remove(temp_path)
-            except:
-                pass
-            
-            # Parse result based on PaddleOCR version
-            text = ""
-            if result and len(result) > 0:
-                first_result = result[0]
-                
-                # PaddleOCR v3 format: OCRResult with 'rec_texts' key
-                if hasattr(first_result, 'get') or isinstance(first_result, dict):
-                    rec_texts = first_result.get('rec_texts', [])
-                    text = " ".join(rec_texts)
-                    print(f"📄 Using v3 format, found {len(rec_texts)} text blocks")
-                    
-                # Legacy format: list of [box, (text, score)]
-                elif isinstance(first_result, list):
-                    for line in first_result:
-                        if line and len(line) >= 2:
-                            text += line[1][0] + " "
-                    print("📄 Using legacy format")
-            
-            summary = text.strip()
-            print(f"📊 Extracted {len(summary)} chars.")
-            
-            if len(summary) > 200:
-                print(f"📝 Content: '{summary[:200]}...'")
-            else:
-                print(f"📝 Content: '{summary}'")
-                
-            return {"result": summary}
-            
-        else:
-            # VLM inference
-            import torch
-            if model is None:
-                raise HTTPException(status_code=503, detail="VLM not loaded")
-                
-            prompt = "Extract all text and structured info from this document."
-            print("🧠 Running VLM inference...")
-            
-            with torch.no_grad():
-                res, _ = model.chat(tokenizer, image_pil, prompt, history=None)
-                
-            print("✅ VLM finished.")
-            return {"result": res}
+        res = await handle_request(image_data)
+        
+        if cache_key is not None:
+            result_cache[cache_key] = res
+            if len(result_cache) > RESULT_CACHE_SIZE:
+                result_cache.popitem(last=False)
+        return {"result": res}
             
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ OCR Error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ OCR Error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
-        is_processing = False
+        inflight -= 1
+
+
+@app.post("/ocr")
+async def perform_ocr(request: OCRRequest):
+    """
+    Perform OCR on a base64-encoded image.
+    
+    Prefer /ocr_raw for new clients: it skips the base64 round trip.
+    
+    Args:
+        request: OCRRequest containing image_base64 (and optionally
+            no_cache=True to bypass the result cache)
+        
+    Returns:
+        {"result": "extracted text content"}
+        
+    Raises:
+        400: If image_base64 is not valid base64
+        503: If model not ready
+        500: If OCR processing fails
+    """
+    return await run_ocr(request.image_base64, use_cache=not request.no_cache)
+
+
+@app.post("/ocr_raw")
+async def perform_ocr_raw(request: Request, no_cache: bool = False):
+    """
+    Perform OCR on an image sent as the raw request body
+    (Content-Type: application/octet-stream).
+    
+    Preferred over /ocr: the raw bytes go straight to the decoder, avoiding
+    the ~33% base64 size overhead and the extra decode pass.
+    
+    Args:
+        request: Request whose body is the encoded image file
+        no_cache: Query parameter; set to true to bypass the result cache
+        
+    Returns:
+        {"result": "extracted text content"}
+        
+    Raises:
+        503: If model not ready
+        500: If OCR processing fails
+    """
+    image_data = await request.body()
+    return await run_ocr(image_data, use_cache=not no_cache)
 
 
 # =============================================================================
@@ -293,4 +673,16 @@ async def perform_ocr(request: OCRRequest):
 # =============================================================================
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="127.0.0.1", port=5000)
+    if num_workers > 1:
+        # Load once in the supervisor first: this downloads the models before
+        # workers race on the shared cache, and exits with code 1 on failure
+        # instead of leaving uvicorn to respawn crashing workers forever
+        load_model()
+        ocr_engine = None
+        handle_request = None
+        
+        # Multiple workers need an import string; each worker loads its own model
+        logger.info("🚀 Starting %d workers (%d threads each)", num_workers, threads_per_worker)
+        uvicorn.run("paddle_bridge:app", host="127.0.0.1", port=5000, workers=num_workers)
+    else:
+        uvicorn.run(app, host="127.0.0.1", port=5000)